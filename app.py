@@ -10,44 +10,113 @@ Then open http://localhost:5000 in a browser.
 
 import io
 import base64
+import hashlib
+import os
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 from dotenv import load_dotenv
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
+from flask.json.provider import DefaultJSONProvider
 from PIL import Image
 
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None
+
 from formease.models import FormDocument, FieldType
-from formease.ocr_engine import ocr_page
+from formease.ocr_engine import ocr_pages_batch
 from formease.field_detector import detect_fields
-from formease.llm_extractor import detect_fields_llm, merge_fields
+from formease.llm_extractor import detect_fields_llm_batch, merge_fields
 from formease.field_ordering import order_fields
-from formease.tts_engine import generate_tts
+from formease.tts_engine import generate_tts_cached
 from formease.translator import translate_text
 from formease.pdf_handler import pdf_to_images, export_filled_pdf, generate_text_summary
 from formease.validators import validate_field
 
+class _OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Noticeably faster than the stdlib encoder for the big /upload responses
+    (hundreds of fields), and emits compact output with no separators.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 32 * 1024 * 1024  # 32 MB for PDFs
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
 
 # Load environment variables from .env if present
 load_dotenv()
 
+SESSION_TTL = 3600  # 1 hour
+SESSION_SWEEP_INTERVAL = 60  # seconds between background expiry sweeps
+
+
+
+class _SessionStore:
+    """In-memory TTL store for FormDocuments, safe under threaded servers.
+
+    A plain dict raced under Flask's threaded dev server / gunicorn threads,
+    and the old per-request cleanup put an O(sessions) scan on the upload
+    hot path. All access goes through an RLock and a daemon thread sweeps
+    expired sessions in the background instead.
+    """
+
+    def __init__(self, ttl: int = SESSION_TTL):
+        self._docs: dict[str, FormDocument] = {}
+        self._lock = threading.RLock()
+        self._ttl = ttl
+        threading.Thread(target=self._sweep_loop, daemon=True).start()
+
+    def get(self, session_id) -> FormDocument | None:
+        with self._lock:
+            return self._docs.get(session_id)
+
+    def __setitem__(self, session_id: str, doc: FormDocument) -> None:
+        with self._lock:
+            self._docs[session_id] = doc
+
+    def _sweep_loop(self) -> None:
+        while True:
+            time.sleep(SESSION_SWEEP_INTERVAL)
+            now = time.time()
+            with self._lock:
+                expired = [
+                    sid for sid, doc in self._docs.items()
+                    if now - doc.settings.get("_created", now) > self._ttl
+                ]
+                for sid in expired:
+                    del self._docs[sid]
+
+
 # In-memory session store  {session_id: FormDocument}
-sessions: dict[str, FormDocument] = {}
+sessions = _SessionStore()
 
-SESSION_TTL = 3600  # 1 hour
 
+def _thumbnail_jpeg(img: Image.Image) -> bytes:
+    """Shrink an image (in place) to a small JPEG thumbnail for the frontend.
 
-def _cleanup_sessions():
-    """Remove sessions older than SESSION_TTL (best-effort, runs on requests)."""
-    now = time.time()
-    expired = [
-        sid for sid, doc in sessions.items()
-        if now - doc.settings.get("_created", now) > SESSION_TTL
-    ]
-    for sid in expired:
-        del sessions[sid]
+    The caller hands over a dedicated handle, so no defensive copy is made
+    before thumbnail() -- copying first forces a full decode + duplicate of
+    the original-resolution pixels.
+    """
+    img.thumbnail((600, 800), Image.LANCZOS)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=70, optimize=False, progressive=False)
+    return buf.getvalue()
 
 
 # ── Routes ──────────────────────────────────────────────────────────────
@@ -61,8 +130,6 @@ def index():
 @app.route("/upload", methods=["POST"])
 def upload():
     """Upload a form (PDF or image) -> OCR + field detection -> return session."""
-    _cleanup_sessions()
-
     if "document" not in request.files:
         return jsonify({"error": "No document in the request."}), 400
 
@@ -87,39 +154,70 @@ def upload():
                 return jsonify({"error": f"Failed to parse PDF: {exc}"}), 400
         else:
             try:
-                pil_images = [Image.open(io.BytesIO(raw_bytes))]
+                img = Image.open(io.BytesIO(raw_bytes))
+                # For JPEGs, let the decoder do cheap DCT-scale downsampling
+                # toward our working size instead of decoding full-resolution
+                # pixels and resizing afterwards.
+                if img.format == "JPEG":
+                    img.draft("RGB", (1200, 1600))
+                pil_images = [img]
             except Exception:
                 return jsonify({"error": "Could not decode that file as an image."}), 400
 
-        # OCR each page and detect fields
+        # OCR all pages in one Tesseract call (amortises its model load),
+        # then fan the OpenCV-heavy heuristic detection out over a process
+        # pool; executor.map keeps results in page order.
         all_fields = []
         pages_response = []
 
-        for i, img in enumerate(pil_images):
-            page_data = ocr_page(img, page_index=i, dpi=300)
-            doc.pages.append(page_data)
+        doc.pages = ocr_pages_batch(pil_images, dpi=300)
 
-            heuristic_fields = detect_fields(page_data)
-            llm_fields = detect_fields_llm(page_data)
-            page_fields = merge_fields(heuristic_fields, llm_fields)
-            all_fields.extend(page_fields)
+        workers = min(len(doc.pages), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            heuristic_lists = list(
+                executor.map(detect_fields, doc.pages, chunksize=1)
+            )
+        results = list(zip(doc.pages, heuristic_lists))
 
-            # Generate a small thumbnail for the frontend
-            thumb = img.copy()
-            thumb.thumbnail((600, 800))
-            thumb_buf = io.BytesIO()
-            thumb.save(thumb_buf, format="JPEG", quality=70)
-            thumb_b64 = base64.b64encode(thumb_buf.getvalue()).decode("ascii")
+        # Thumbnails: render a separate 72dpi pass for PDFs instead of
+        # shrinking the 300dpi OCR bitmaps; for single images, reopen the
+        # upload bytes so draft-mode JPEG decoding can do the downscale.
+        if doc.is_pdf:
+            try:
+                thumb_images = pdf_to_images(raw_bytes, dpi=72)
+            except Exception:
+                thumb_images = [
+                    Image.open(io.BytesIO(p.image_bytes)) for p in doc.pages
+                ]
+        else:
+            thumb = Image.open(io.BytesIO(raw_bytes))
+            if thumb.format == "JPEG":
+                thumb.draft("RGB", (600, 800))
+            thumb_images = [thumb]
+        doc.thumbnails = {i: _thumbnail_jpeg(t) for i, t in enumerate(thumb_images)}
+
+        # One LLM request for the whole document instead of one per page
+        llm_fields = detect_fields_llm_batch(doc.pages)
+        llm_by_page: dict[int, list] = {}
+        for f in llm_fields:
+            llm_by_page.setdefault(f.page_index, []).append(f)
+
+        for i, (page_data, heuristic_fields) in enumerate(results):
+            page_fields = merge_fields(
+                heuristic_fields, llm_by_page.get(page_data.page_index, [])
+            )
+            all_fields.extend(page_fields)
 
             pages_response.append({
                 "page_index": i,
-                "thumbnail": thumb_b64,
+                "thumbnail_url": f"/thumb/{doc.document_id}/{i}.jpg",
                 "width": page_data.width,
                 "height": page_data.height,
             })
 
         # Order fields and store
         doc.fields = order_fields(all_fields)
+        doc.fields_by_id = {f.field_id: f for f in doc.fields}
         sessions[doc.document_id] = doc
 
         fields_response = []
@@ -129,8 +227,8 @@ def upload():
                 "page_index": f.page_index,
                 "label_text": f.label_text,
                 "field_type": f.field_type.value,
-                "target_bbox": list(f.target_bbox),
-                "label_bbox": list(f.label_bbox),
+                "target_bbox": list(map(int, f.target_bbox)),
+                "label_bbox": list(map(int, f.label_bbox)),
                 "required": f.required,
                 "confidence": f.confidence,
             })
@@ -146,6 +244,27 @@ def upload():
         return jsonify({"error": f"Upload failed: {exc}"}), 500
 
 
+@app.route("/thumb/<session_id>/<int:page_index>.jpg")
+def thumb(session_id, page_index):
+    """Serve a page thumbnail as a cacheable JPEG.
+
+    Keeping thumbnails out of the upload JSON avoids the 4/3 base64
+    inflation and lets the browser cache them across navigation.
+    """
+    doc = sessions.get(session_id)
+    if not doc:
+        return jsonify({"error": "Session not found."}), 404
+
+    data = doc.thumbnails.get(page_index)
+    if data is None:
+        return jsonify({"error": "Page not found."}), 404
+
+    return Response(data, mimetype="image/jpeg", headers={
+        "Cache-Control": "public, max-age=3600, immutable",
+        "ETag": hashlib.sha1(data).hexdigest(),
+    })
+
+
 @app.route("/tts/<session_id>/<field_id>")
 def tts(session_id, field_id):
     """Generate TTS audio for a field's label text."""
@@ -153,7 +272,7 @@ def tts(session_id, field_id):
     if not doc:
         return jsonify({"error": "Session not found."}), 404
 
-    field = next((f for f in doc.fields if f.field_id == field_id), None)
+    field = doc.fields_by_id.get(field_id)
     if not field:
         return jsonify({"error": "Field not found."}), 404
 
@@ -165,7 +284,7 @@ def tts(session_id, field_id):
         text = translate_text(text, lang)
 
     try:
-        audio_bytes = generate_tts(text, lang)
+        audio_bytes = generate_tts_cached(text, lang)
     except Exception as exc:
         return jsonify({"error": f"TTS failed: {exc}"}), 503
 
@@ -188,7 +307,7 @@ def translate():
     if not doc:
         return jsonify({"error": "Session not found."}), 404
 
-    field = next((f for f in doc.fields if f.field_id == field_id), None)
+    field = doc.fields_by_id.get(field_id)
     if not field:
         return jsonify({"error": "Field not found."}), 404
 
@@ -213,7 +332,7 @@ def validate():
     if not doc:
         return jsonify({"error": "Session not found."}), 404
 
-    field = next((f for f in doc.fields if f.field_id == field_id), None)
+    field = doc.fields_by_id.get(field_id)
     if not field:
         return jsonify({"error": "Field not found."}), 404
 
@@ -245,9 +364,10 @@ def save_answers():
     if not doc:
         return jsonify({"error": "Session not found."}), 404
 
-    for field in doc.fields:
-        if field.field_id in answers:
-            field.answer = answers[field.field_id]
+    for field_id, answer in answers.items():
+        field = doc.fields_by_id.get(field_id)
+        if field is not None:
+            field.answer = answer
 
     return jsonify({
         "status": "saved",
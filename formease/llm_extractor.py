@@ -1,12 +1,25 @@
+import asyncio
+import hashlib
 import json
 import os
 import re
+import time
+from pathlib import Path
 from typing import Iterable
 
+import numpy as np
+
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI, RateLimitError
 except Exception:  # pragma: no cover - optional dependency
     OpenAI = None  # type: ignore
+    AsyncOpenAI = None  # type: ignore
+    RateLimitError = Exception  # type: ignore
 
 from formease.models import FormField, FieldType, PageData
 from formease.field_detector import (
@@ -17,6 +30,7 @@ from formease.field_detector import (
     group_into_lines,
     infer_answer_region,
     is_required,
+    line_mean_confidences,
     merge_bboxes,
 )
 
@@ -37,6 +51,35 @@ _ENV_STOP_LABELS = {
     if s.strip()
 }
 
+# On-disk cache of per-page LLM results, keyed by page pixels + model, so
+# re-uploading the same document (or dev-server reloads) costs no API calls.
+_CACHE_DIR = Path(
+    os.getenv("FORMEASE_CACHE_DIR", "~/.cache/formease")
+).expanduser() / "llm"
+_CACHE_TTL_SECONDS = 30 * 24 * 3600  # 30 days
+
+# Global concurrency cap for the per-page async path
+_LLM_CONCURRENCY = max(1, int(os.getenv("FORMEASE_LLM_CONCURRENCY", "8")))
+_RETRY_ATTEMPTS = 3
+_RETRY_BASE_SECONDS = 1.0
+_RETRY_MAX_SECONDS = 30.0
+
+# Payload quantization: lines below this confidence are OCR noise and only
+# burn input tokens; bboxes are snapped to a 4px grid (values pre-divided by
+# 4) so coordinates serialize in fewer digits.
+_MIN_LINE_CONFIDENCE = 0.4
+_BBOX_GRID_SHIFT = 2  # 1 << 2 = 4px grid
+
+_SYSTEM_MSG = (
+    "You extract form fields from OCR lines. "
+    "Return JSON only, matching the schema. "
+    "Identify labels that correspond to user input fields. "
+    "Tag every field with the page_index of the page it came from. "
+    "All bbox coordinates are on a 4-pixel grid (real pixels divided by 4); "
+    "return label_bbox on the same grid. "
+    "Use only these field_type values: text, number, date, email, phone, checkbox, nric."
+)
+
 
 def _looks_like_instruction(text: str) -> bool:
     """Heuristic filter for paragraph-like labels or instructions."""
@@ -78,125 +121,331 @@ def _as_int_bbox(values: Iterable[int | float]) -> tuple:
 
 
 def _build_line_items(page: PageData, max_lines: int = 200) -> list[dict]:
-    lines = group_into_lines(page.ocr_blocks)
+    ocr = page.ocr
+    lines = group_into_lines(ocr)
+    line_confs = line_mean_confidences(ocr, lines)
     items = []
-    for line_words in lines:
-        line_text = " ".join(w.text for w in line_words).strip()
+    for li, line_idx in enumerate(lines):
+        line_text = " ".join(ocr.text[line_idx]).strip()
         if not line_text:
             continue
-        line_bbox = merge_bboxes([w.bbox for w in line_words])
-        avg_conf = sum(w.confidence for w in line_words) / max(len(line_words), 1)
+        line_boxes = ocr.bbox[line_idx]
+        line_bbox = (
+            int(line_boxes[:, 0].min()), int(line_boxes[:, 1].min()),
+            int(line_boxes[:, 2].max()), int(line_boxes[:, 3].max()),
+        )
+        avg_conf = float(line_confs[li])
+        if avg_conf < _MIN_LINE_CONFIDENCE:
+            continue  # OCR noise; not worth its tokens
         items.append({
             "text": line_text,
-            "bbox": list(line_bbox),
-            "confidence": round(avg_conf, 3),
+            "bbox": [v >> _BBOX_GRID_SHIFT for v in line_bbox],
+            "confidence": round(avg_conf, 1),
         })
 
     # Keep in reading order; cap to avoid huge prompts
     return items[:max_lines]
 
 
-def detect_fields_llm(page: PageData, model: str | None = None) -> list[FormField]:
-    """Use an OpenAI model to extract form fields from OCR lines."""
-    api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not api_key or OpenAI is None:
-        print("[LLM] Skipping: missing OPENAI_API_KEY or openai package.")
-        return []
+def _build_page_items(pages: list[PageData]) -> list[dict]:
+    page_items = []
+    for page in pages:
+        line_items = _build_line_items(page)
+        if not line_items:
+            continue
+        page_items.append({
+            "page_index": page.page_index,
+            "width": page.width,
+            "height": page.height,
+            "ocr_lines": line_items,
+        })
+    return page_items
 
-    model = model or os.getenv("FORMEASE_LLM_MODEL", "gpt-4o-mini")
 
-    line_items = _build_line_items(page)
-    if not line_items:
-        return []
+def _dumps(obj) -> str:
+    """Serialize with orjson when available (faster, no inter-token spaces)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
 
-    client = OpenAI()
 
-    system_msg = (
-        "You extract form fields from OCR lines. "
-        "Return JSON only, matching the schema. "
-        "Identify labels that correspond to user input fields. "
-        "Use only these field_type values: text, number, date, email, phone, checkbox, nric."
-    )
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
-    user_payload = {
-        "page": {
-            "width": page.width,
-            "height": page.height,
-        },
-        "ocr_lines": line_items,
+
+def _request_kwargs(page_items: list[dict], model: str) -> dict:
+    """Build the chat-completions kwargs shared by the sync and async paths."""
+    user_payload = {"pages": page_items}
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": _SYSTEM_MSG},
+            {
+                "role": "user",
+                "content": "Extract fields from OCR lines as JSON: " + _dumps(user_payload),
+            },
+        ],
+        "response_format": {"type": "json_schema", "json_schema": _FIELDS_SCHEMA},
+        "temperature": 0,
     }
 
-    schema = {
-        "name": "form_fields",
-        "description": "Extracted form field labels from OCR lines",
-        "schema": {
-            "type": "object",
-            "additionalProperties": False,
-            "properties": {
-                "fields": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "additionalProperties": False,
-                        "properties": {
-                            "label_text": {"type": "string"},
-                            "field_type": {
-                                "type": "string",
-                                "enum": sorted(_FIELD_TYPE_VALUES),
-                            },
-                            "label_bbox": {
-                                "type": "array",
-                                "items": {"type": "integer"},
-                                "minItems": 4,
-                                "maxItems": 4,
-                            },
-                            "required": {"type": "boolean"},
-                            "confidence": {"type": "number"},
+
+_FIELDS_SCHEMA = {
+    "name": "form_fields",
+    "description": "Extracted form field labels from OCR lines",
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "properties": {
+            "fields": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "properties": {
+                        "page_index": {"type": "integer"},
+                        "label_text": {"type": "string"},
+                        "field_type": {
+                            "type": "string",
+                            "enum": sorted(_FIELD_TYPE_VALUES),
+                        },
+                        "label_bbox": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "minItems": 4,
+                            "maxItems": 4,
                         },
-                        "required": [
-                            "label_text",
-                            "field_type",
-                            "label_bbox",
-                            "required",
-                            "confidence",
-                        ],
+                        "required": {"type": "boolean"},
+                        "confidence": {"type": "number"},
                     },
+                    "required": [
+                        "page_index",
+                        "label_text",
+                        "field_type",
+                        "label_bbox",
+                        "required",
+                        "confidence",
+                    ],
                 },
             },
-            "required": ["fields"],
         },
-        "strict": True,
-    }
+        "required": ["fields"],
+    },
+    "strict": True,
+}
+
 
+def _cache_key(page: PageData, model: str) -> str:
+    return hashlib.sha256(page.image_bytes + model.encode()).hexdigest()
+
+
+def _cache_get(key: str) -> list[FormField] | None:
+    """Load cached fields for one page; None on miss, expiry, or bad data."""
+    path = _CACHE_DIR / f"{key}.json"
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_msg},
-                {
-                    "role": "user",
-                    "content": "Extract fields from OCR lines as JSON: " + json.dumps(user_payload),
-                },
-            ],
-            response_format={"type": "json_schema", "json_schema": schema},
-            temperature=0,
-        )
-    except Exception as exc:
-        print(f"[LLM] Request failed: {exc}")
-        return []
+        if time.time() - path.stat().st_mtime > _CACHE_TTL_SECONDS:
+            return None
+        items = _loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+    fields = []
+    for item in items:
+        try:
+            fields.append(FormField(
+                field_id=item["field_id"],
+                page_index=item["page_index"],
+                label_text=item["label_text"],
+                field_type=_field_type_from_value(item["field_type"]),
+                target_bbox=tuple(item["target_bbox"]),
+                label_bbox=tuple(item["label_bbox"]),
+                required=item["required"],
+                confidence=item["confidence"],
+            ))
+        except (KeyError, TypeError):
+            return None
+    return fields
 
+
+def _cache_put(key: str, fields: list[FormField]) -> None:
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        payload = [
+            {
+                "field_id": f.field_id,
+                "page_index": f.page_index,
+                "label_text": f.label_text,
+                "field_type": f.field_type.value,
+                "target_bbox": list(f.target_bbox),
+                "label_bbox": list(f.label_bbox),
+                "required": f.required,
+                "confidence": f.confidence,
+            }
+            for f in fields
+        ]
+        (_CACHE_DIR / f"{key}.json").write_text(_dumps(payload))
+    except OSError:
+        pass  # best-effort cache
+
+
+def _raw_fields_from_response(response) -> list[dict]:
     try:
         content = response.choices[0].message.content
-        data = json.loads(content) if content else {}
-        raw_fields = data.get("fields", [])
+        data = _loads(content) if content else {}
+        return data.get("fields", [])
     except Exception as exc:
         print(f"[LLM] Response parse failed: {exc}")
         return []
 
-    input_regions = detect_input_regions(page.image_bytes)
+
+def detect_fields_llm(page: PageData, model: str | None = None) -> list[FormField]:
+    """Use an OpenAI model to extract form fields from a single page."""
+    return detect_fields_llm_batch([page], model=model)
+
+
+def detect_fields_llm_batch(
+    pages: list[PageData], model: str | None = None
+) -> list[FormField]:
+    """Extract form fields for all pages of a document in one LLM request.
+
+    Sending every page in a single payload collapses N network round-trips
+    (and N copies of the system prompt) into one; fields come back tagged
+    with ``page_index`` and are post-processed against their own page.
+
+    Per-page results are cached on disk, so only pages not seen before
+    (for this model) are actually sent.
+    """
+    model = model or os.getenv("FORMEASE_LLM_MODEL", "gpt-4o-mini")
+
+    cached_fields: list[FormField] = []
+    miss_pages: list[PageData] = []
+    for page in pages:
+        hit = _cache_get(_cache_key(page, model))
+        if hit is not None:
+            cached_fields.extend(hit)
+        else:
+            miss_pages.append(page)
+    if not miss_pages:
+        return cached_fields
+
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not api_key or OpenAI is None:
+        print("[LLM] Skipping: missing OPENAI_API_KEY or openai package.")
+        return cached_fields
+
+    page_items = _build_page_items(miss_pages)
+    if not page_items:
+        return cached_fields
+
+    client = OpenAI()
+
+    try:
+        response = client.chat.completions.create(**_request_kwargs(page_items, model))
+    except Exception as exc:
+        print(f"[LLM] Request failed: {exc}")
+        return cached_fields
+
+    new_fields = _fields_from_raw(_raw_fields_from_response(response), miss_pages)
+
+    by_page: dict[int, list[FormField]] = {p.page_index: [] for p in miss_pages}
+    for f in new_fields:
+        by_page.setdefault(f.page_index, []).append(f)
+    for page in miss_pages:
+        _cache_put(_cache_key(page, model), by_page.get(page.page_index, []))
+
+    return cached_fields + new_fields
+
+
+async def detect_fields_llm_async(
+    page: PageData,
+    model: str | None = None,
+    client=None,
+    semaphore: asyncio.Semaphore | None = None,
+) -> list[FormField]:
+    """Async single-page variant with rate-limit backoff.
+
+    Used by ``detect_fields_llm_concurrent`` so per-page requests overlap
+    instead of serializing; wall time becomes ~max(latency) rather than
+    sum(latency). Retries 429s with exponential backoff.
+    """
+    if AsyncOpenAI is None:
+        return []
+
+    model = model or os.getenv("FORMEASE_LLM_MODEL", "gpt-4o-mini")
+
+    cached = _cache_get(_cache_key(page, model))
+    if cached is not None:
+        return cached
+
+    page_items = _build_page_items([page])
+    if not page_items:
+        return []
+
+    client = client or AsyncOpenAI()
+    semaphore = semaphore or asyncio.Semaphore(_LLM_CONCURRENCY)
+
+    async with semaphore:
+        for attempt in range(_RETRY_ATTEMPTS):
+            try:
+                response = await client.chat.completions.create(
+                    **_request_kwargs(page_items, model)
+                )
+                break
+            except RateLimitError:
+                if attempt == _RETRY_ATTEMPTS - 1:
+                    print(f"[LLM] Page {page.page_index}: rate limited, giving up.")
+                    return []
+                await asyncio.sleep(
+                    min(_RETRY_MAX_SECONDS, _RETRY_BASE_SECONDS * 2 ** attempt)
+                )
+            except Exception as exc:
+                print(f"[LLM] Request failed: {exc}")
+                return []
+
+    fields = _fields_from_raw(_raw_fields_from_response(response), [page])
+    _cache_put(_cache_key(page, model), fields)
+    return fields
+
+
+def detect_fields_llm_concurrent(
+    pages: list[PageData], model: str | None = None
+) -> list[FormField]:
+    """Per-page LLM requests issued concurrently under one event loop.
+
+    Alternative to ``detect_fields_llm_batch`` for documents too large for a
+    single context window. Concurrency is capped by a shared semaphore bound
+    from ``FORMEASE_LLM_CONCURRENCY`` (default 8) to stay under API limits.
+    """
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not api_key or AsyncOpenAI is None:
+        print("[LLM] Skipping: missing OPENAI_API_KEY or openai package.")
+        return []
+
+    async def _gather():
+        client = AsyncOpenAI()
+        semaphore = asyncio.Semaphore(_LLM_CONCURRENCY)
+        results = await asyncio.gather(*[
+            detect_fields_llm_async(p, model=model, client=client, semaphore=semaphore)
+            for p in pages
+        ])
+        return [f for page_fields in results for f in page_fields]
+
+    return asyncio.run(_gather())
+
+
+def _fields_from_raw(raw_fields: list[dict], pages: list[PageData]) -> list[FormField]:
+    """Validate raw LLM field dicts and resolve them against their pages."""
+    pages_by_index = {p.page_index: p for p in pages}
+    regions_by_index: dict[int, np.ndarray] = {}
     fields: list[FormField] = []
 
     for idx, item in enumerate(raw_fields):
+        page = pages_by_index.get(item.get("page_index"))
+        if page is None:
+            continue
+
         label_text = clean_label(str(item.get("label_text", "")).strip())
         if not label_text:
             continue
@@ -209,6 +458,14 @@ def detect_fields_llm(page: PageData, model: str | None = None) -> list[FormFiel
         label_bbox = _as_int_bbox(item.get("label_bbox", []))
         if label_bbox == (0, 0, 0, 0):
             continue
+        # Scale off the 4px payload grid back to real pixels
+        label_bbox = tuple(v << _BBOX_GRID_SHIFT for v in label_bbox)
+
+        if page.page_index not in regions_by_index:
+            regions_by_index[page.page_index] = detect_input_regions(
+                page.gray if page.gray is not None else page.image_bytes
+            )
+        input_regions = regions_by_index[page.page_index]
 
         target = find_nearest_input_region(label_bbox, input_regions)
         inferred = False
@@ -242,27 +499,26 @@ def detect_fields_llm(page: PageData, model: str | None = None) -> list[FormFiel
 
 
 def merge_fields(heuristic: list[FormField], llm: list[FormField]) -> list[FormField]:
-    """Merge LLM fields with heuristic fields, de-duping by label text."""
+    """Merge LLM fields with heuristic fields, de-duping by label text.
+
+    Built as a dict keyed on the lower-cased label so the merge is O(N);
+    on key collisions the higher-confidence field wins.
+    """
     if not llm:
         return heuristic
 
-    merged = list(heuristic)
-    seen = {f.label_text.strip().lower(): f for f in heuristic}
+    by_key = {
+        f.label_text.strip().lower(): f
+        for f in heuristic
+        if f.label_text.strip()
+    }
 
     for f in llm:
         key = f.label_text.strip().lower()
         if not key:
             continue
-        if key not in seen:
-            merged.append(f)
-            seen[key] = f
-            continue
-
         # Prefer the higher-confidence field
-        if f.confidence > seen[key].confidence:
-            existing = seen[key]
-            merged.remove(existing)
-            merged.append(f)
-            seen[key] = f
+        if key not in by_key or f.confidence > by_key[key].confidence:
+            by_key[key] = f
 
-    return merged
+    return list(by_key.values())
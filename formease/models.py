@@ -3,6 +3,8 @@ from typing import Optional
 from enum import Enum
 import uuid
 
+import numpy as np
+
 
 class FieldType(Enum):
     TEXT = "text"
@@ -32,6 +34,54 @@ class OcrBlock:
     word_num: int
 
 
+@dataclass
+class PageOcr:
+    """Structure-of-arrays view of a page's OCR output.
+
+    Parallel arrays (one entry per OCR word) keep the hot grouping and
+    averaging paths vectorized instead of iterating dataclass attributes.
+    ``text`` is an object array so it can be fancy-indexed alongside the
+    numeric columns.
+    """
+    text: np.ndarray  # (N,) object (str)
+    bbox: np.ndarray  # (N, 4) int32
+    conf: np.ndarray  # (N,) float32
+    level: np.ndarray  # (N,) int32
+    block_num: np.ndarray  # (N,) int32
+    line_num: np.ndarray  # (N,) int32
+    word_num: np.ndarray  # (N,) int32
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @classmethod
+    def empty(cls) -> "PageOcr":
+        return cls(
+            text=np.empty(0, dtype=object),
+            bbox=np.empty((0, 4), dtype=np.int32),
+            conf=np.empty(0, dtype=np.float32),
+            level=np.empty(0, dtype=np.int32),
+            block_num=np.empty(0, dtype=np.int32),
+            line_num=np.empty(0, dtype=np.int32),
+            word_num=np.empty(0, dtype=np.int32),
+        )
+
+    def to_blocks(self) -> list:
+        """Materialize OcrBlock objects (compat view for non-hot-path code)."""
+        return [
+            OcrBlock(
+                text=self.text[i],
+                bbox=tuple(int(v) for v in self.bbox[i]),
+                confidence=float(self.conf[i]),
+                level=int(self.level[i]),
+                block_num=int(self.block_num[i]),
+                line_num=int(self.line_num[i]),
+                word_num=int(self.word_num[i]),
+            )
+            for i in range(len(self.text))
+        ]
+
+
 @dataclass
 class FormField:
     field_id: str
@@ -52,8 +102,14 @@ class PageData:
     image_bytes: bytes  # original page image as PNG bytes
     width: int
     height: int
-    ocr_blocks: list  # list[OcrBlock]
+    ocr: PageOcr
     dpi: int = 300
+    gray: Optional[np.ndarray] = None  # grayscale page pixels, (H, W) uint8
+
+    @property
+    def ocr_blocks(self) -> list:
+        """Lazy list[OcrBlock] view of the SoA arrays (backward compat)."""
+        return self.ocr.to_blocks()
 
 
 @dataclass
@@ -63,6 +119,8 @@ class FormDocument:
     is_pdf: bool = False
     pages: list = field(default_factory=list)  # list[PageData]
     fields: list = field(default_factory=list)  # list[FormField]
+    fields_by_id: dict = field(default_factory=dict)  # {field_id: FormField}
+    thumbnails: dict = field(default_factory=dict)  # {page_index: JPEG bytes}
     original_pdf_bytes: Optional[bytes] = None
     settings: dict = field(default_factory=lambda: {
         "mode": "standard",
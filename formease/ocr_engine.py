@@ -1,40 +1,64 @@
+import csv
 import io
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
 import pytesseract
 from PIL import Image
-from formease.models import OcrBlock, PageData
+from formease.models import PageOcr, PageData
+
+
+def _parse_tsv(tsv: str) -> pd.DataFrame:
+    """Parse Tesseract TSV output into a filtered DataFrame.
+
+    read_csv's C parser replaces the per-row Python loop; rows with
+    negative confidence or empty text are dropped in one vectorized pass.
+    """
+    df = pd.read_csv(
+        io.StringIO(tsv),
+        sep="\t",
+        quoting=csv.QUOTE_NONE,
+        na_filter=False,
+        dtype={"text": str},
+    )
+    conf = df["conf"].astype(float).astype(int)
+    text = df["text"].astype(str).str.strip()
+    df = df.assign(conf=conf, text=text)
+    return df[(conf >= 0) & (text != "")]
+
+
+def _page_ocr_from_df(df: pd.DataFrame) -> PageOcr:
+    """Build PageOcr arrays straight from the DataFrame columns."""
+    if df.empty:
+        return PageOcr.empty()
+
+    left = df["left"].to_numpy(np.int32)
+    top = df["top"].to_numpy(np.int32)
+    width = df["width"].to_numpy(np.int32)
+    height = df["height"].to_numpy(np.int32)
+
+    return PageOcr(
+        text=df["text"].to_numpy(dtype=object),
+        bbox=np.stack([left, top, left + width, top + height], axis=1),
+        conf=(df["conf"].to_numpy(np.float32) / 100.0),
+        level=df["level"].to_numpy(np.int32),
+        block_num=df["block_num"].to_numpy(np.int32),
+        line_num=df["line_num"].to_numpy(np.int32),
+        word_num=df["word_num"].to_numpy(np.int32),
+    )
 
 
 def ocr_page(image: Image.Image, page_index: int, dpi: int = 300) -> PageData:
     """Run OCR on a PIL Image and return structured data with bounding boxes."""
     image_rgb = image.convert("RGB")
 
-    data = pytesseract.image_to_data(
-        image_rgb, config="--psm 3", output_type=pytesseract.Output.DICT
+    tsv = pytesseract.image_to_data(
+        image_rgb, config="--psm 3", output_type=pytesseract.Output.STRING
     )
 
-    blocks = []
-    n = len(data["text"])
-    for i in range(n):
-        text = data["text"][i].strip()
-        conf = int(data["conf"][i])
-        if conf < 0 or not text:
-            continue
-
-        x = data["left"][i]
-        y = data["top"][i]
-        w = data["width"][i]
-        h = data["height"][i]
-
-        blocks.append(OcrBlock(
-            text=text,
-            bbox=(x, y, x + w, y + h),
-            confidence=conf / 100.0,
-            level=data["level"][i],
-            block_num=data["block_num"][i],
-            line_num=data["line_num"][i],
-            word_num=data["word_num"][i],
-        ))
-
     buf = io.BytesIO()
     image_rgb.save(buf, format="PNG")
 
@@ -43,6 +67,65 @@ def ocr_page(image: Image.Image, page_index: int, dpi: int = 300) -> PageData:
         image_bytes=buf.getvalue(),
         width=image_rgb.width,
         height=image_rgb.height,
-        ocr_blocks=blocks,
+        ocr=_page_ocr_from_df(_parse_tsv(tsv)),
         dpi=dpi,
+        # Keep the decoded grayscale pixels so region detection doesn't have
+        # to round-trip the page through PNG encode/decode.
+        gray=np.asarray(image_rgb.convert("L")),
     )
+
+
+def ocr_pages_batch(images: list[Image.Image], dpi: int = 300) -> list[PageData]:
+    """OCR every page of a document in a single Tesseract invocation.
+
+    Tesseract reloads its language models on each spawn, so per-page calls
+    pay that cost N times. Feeding it a list-of-filenames input amortises
+    the model load over the whole document; the TSV output is split back
+    into pages on its page_num column. Falls back to per-page ocr_page if
+    the batch call fails (e.g. no tesseract binary on PATH).
+    """
+    images_rgb = [img.convert("RGB") for img in images]
+    try:
+        return _ocr_pages_batch(images_rgb, dpi)
+    except Exception:
+        return [
+            ocr_page(img, page_index=i, dpi=dpi)
+            for i, img in enumerate(images_rgb)
+        ]
+
+
+def _ocr_pages_batch(images_rgb: list[Image.Image], dpi: int) -> list[PageData]:
+    with tempfile.TemporaryDirectory(prefix="formease-ocr-") as tmp:
+        tmp_path = Path(tmp)
+
+        png_paths = []
+        for i, img in enumerate(images_rgb):
+            path = tmp_path / f"page_{i:04d}.png"
+            img.save(path, format="PNG")
+            png_paths.append(path)
+
+        list_file = tmp_path / "list.txt"
+        list_file.write_text("\n".join(str(p) for p in png_paths) + "\n")
+
+        proc = subprocess.run(
+            ["tesseract", str(list_file), "stdout", "--psm", "3", "tsv"],
+            capture_output=True,
+            check=True,
+        )
+        tsv = proc.stdout.decode("utf-8", errors="replace")
+
+        df = _parse_tsv(tsv)
+        page_num = df["page_num"].astype(int)  # tesseract pages are 1-based
+
+        return [
+            PageData(
+                page_index=i,
+                image_bytes=path.read_bytes(),
+                width=img.width,
+                height=img.height,
+                ocr=_page_ocr_from_df(df[page_num == i + 1]),
+                dpi=dpi,
+                gray=np.asarray(img.convert("L")),
+            )
+            for i, (img, path) in enumerate(zip(images_rgb, png_paths))
+        ]
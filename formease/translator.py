@@ -1,5 +1,20 @@
+import asyncio
+import functools
+import hashlib
+import html
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+
 from deep_translator import GoogleTranslator
 
+try:
+    import httpx
+except ImportError:  # httpx is optional; async helpers fall back to threads
+    httpx = None
+
 LANG_MAP = {
     "zh": "zh-CN",
     "ms": "ms",
@@ -7,7 +22,88 @@ LANG_MAP = {
     "en": "en",
 }
 
-_cache: dict[tuple[str, str], str] = {}
+_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+
+def _open_db() -> sqlite3.Connection | None:
+    """Open the on-disk translation cache shared across worker processes.
+
+    WAL mode lets gunicorn workers read while one writes; translations
+    survive restarts, so cold starts stop re-hitting GoogleTranslator.
+    Expired rows are swept once here at startup. Returns None (dict-only
+    caching) if the database can't be opened.
+    """
+    try:
+        db_path = (
+            Path(os.getenv("FORMEASE_CACHE_DIR", "~/.cache/formease")).expanduser()
+            / "translations.db"
+        )
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS translations "
+            "(k BLOB PRIMARY KEY, v TEXT, ts INTEGER)"
+        )
+        db.execute(
+            "DELETE FROM translations WHERE ts < ?",
+            (int(time.time()) - _CACHE_TTL_SECONDS,),
+        )
+        return db
+    except Exception:
+        return None
+
+
+_db = _open_db()
+
+
+def _db_key(text: str, target_lang: str) -> bytes:
+    return hashlib.blake2b(
+        f"{target_lang}\0{text}".encode(), digest_size=16
+    ).digest()
+
+
+def _db_get(text: str, target_lang: str) -> str | None:
+    if _db is None:
+        return None
+    try:
+        row = _db.execute(
+            "SELECT v FROM translations WHERE k = ?", (_db_key(text, target_lang),)
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def _db_put(text: str, target_lang: str, result: str) -> None:
+    if _db is None:
+        return
+    try:
+        _db.execute(
+            "INSERT OR REPLACE INTO translations VALUES (?, ?, ?)",
+            (_db_key(text, target_lang), result, int(time.time())),
+        )
+    except sqlite3.Error:
+        pass
+
+
+@functools.lru_cache(maxsize=10_000)
+def _translate_cached(text: str, target_lang: str) -> str:
+    """Bounded in-process L1 over the SQLite L2 over the network.
+
+    An unbounded dict grew without limit on a long-running server;
+    lru_cache keeps the hot entries and evicts in C. Exceptions are not
+    cached, so transient network failures don't poison an entry.
+    """
+    cached = _db_get(text, target_lang)
+    if cached is not None:
+        return cached
+
+    dl_lang = LANG_MAP.get(target_lang, target_lang)
+    result = GoogleTranslator(source="en", target=dl_lang).translate(text)
+    _db_put(text, target_lang, result)
+    return result
 
 
 def translate_text(text: str, target_lang: str) -> str:
@@ -15,14 +111,105 @@ def translate_text(text: str, target_lang: str) -> str:
     if target_lang == "en" or not text.strip():
         return text
 
-    cache_key = (text, target_lang)
-    if cache_key in _cache:
-        return _cache[cache_key]
+    try:
+        return _translate_cached(text, target_lang)
+    except Exception:
+        return text
+
+
+def translate_many(texts: list[str], target_lang: str) -> list[str]:
+    """Translate a batch of strings in one request. Originals on failure.
+
+    Uncached strings go to GoogleTranslator.translate_batch in a single
+    HTTP round trip instead of one per string; cached and blank entries
+    are filled in from the dict/SQLite caches.
+    """
+    if target_lang == "en":
+        return list(texts)
+
+    resolved: dict[str, str] = {}
+    misses = []
+    for text in texts:
+        if not text.strip() or text in resolved:
+            continue
+        cached = _db_get(text, target_lang)
+        if cached is not None:
+            resolved[text] = cached
+        else:
+            misses.append(text)
+
+    if misses:
+        try:
+            dl_lang = LANG_MAP.get(target_lang, target_lang)
+            results = GoogleTranslator(
+                source="en", target=dl_lang
+            ).translate_batch(misses)
+            for text, result in zip(misses, results):
+                resolved[text] = result
+                _db_put(text, target_lang, result)
+        except Exception:
+            pass  # leave misses unresolved; fall back to originals below
+
+    return [resolved.get(t, t) for t in texts]
+
+
+# --- Async fan-out (overlaps network latency across requests) ---
+
+# Same mobile endpoint GoogleTranslator scrapes; the result sits in a
+# t0 / result-container div.
+_GOOGLE_MOBILE_URL = "https://translate.google.com/m"
+_RESULT_RE = re.compile(r'class="(?:t0|result-container)">([^<]+)<')
+
+
+async def translate_text_async(text: str, target_lang: str, client=None) -> str:
+    """Async translate_text. Returns the original string on failure.
+
+    With an httpx.AsyncClient the request goes straight to the Google
+    mobile endpoint GoogleTranslator scrapes; without httpx (or without a
+    client) the sync path runs in a worker thread instead.
+    """
+    if target_lang == "en" or not text.strip():
+        return text
+
+    cached = _db_get(text, target_lang)
+    if cached is not None:
+        return cached
+
+    if httpx is None or client is None:
+        return await asyncio.to_thread(translate_text, text, target_lang)
 
     try:
-        dl_lang = LANG_MAP.get(target_lang, target_lang)
-        result = GoogleTranslator(source="en", target=dl_lang).translate(text)
-        _cache[cache_key] = result
+        resp = await client.get(_GOOGLE_MOBILE_URL, params={
+            "sl": "en",
+            "tl": LANG_MAP.get(target_lang, target_lang),
+            "q": text,
+        })
+        resp.raise_for_status()
+        m = _RESULT_RE.search(resp.text)
+        if not m:
+            return text
+        result = html.unescape(m.group(1))
+        _db_put(text, target_lang, result)
         return result
     except Exception:
         return text
+
+
+async def translate_many_async(texts: list[str], target_lang: str) -> list[str]:
+    """Translate strings concurrently; wall clock ~ max(RTT), not sum.
+
+    Used when a single batched request isn't possible (e.g. mixed
+    languages across calls); otherwise prefer translate_many.
+    """
+    if target_lang == "en":
+        return list(texts)
+
+    if httpx is None:
+        return await asyncio.to_thread(translate_many, texts, target_lang)
+
+    async with httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=20), timeout=10.0
+    ) as client:
+        return list(await asyncio.gather(*(
+            translate_text_async(t, target_lang, client) for t in texts
+        )))
@@ -1,5 +1,15 @@
+import hashlib
 import io
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
 from gtts import gTTS
+from gtts.tokenizer import Tokenizer, tokenizer_cases
 
 GTTS_LANG_MAP = {
     "en": "en",
@@ -8,17 +18,95 @@ GTTS_LANG_MAP = {
     "ta": "ta",
 }
 
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_TTS_WORKERS = 8
+
+# gTTS builds (and regex-compiles) its default tokenizer on every
+# instantiation; share one across calls instead.
+_GTTS_TOKENIZER = Tokenizer([
+    tokenizer_cases.tone_marks,
+    tokenizer_cases.period_comma,
+    tokenizer_cases.colon,
+    tokenizer_cases.other_punctuation,
+]).run
+
+# Field labels and help text repeat constantly across page loads, so cache
+# synthesized audio on disk instead of re-hitting Google every time.
+_CACHE_DIR = (
+    Path(os.getenv("FORMEASE_CACHE_DIR", "~/.cache/formease")).expanduser() / "tts"
+)
+_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+
+def _sweep_cache() -> None:
+    """Drop cached audio older than the TTL. Runs once at import."""
+    cutoff = time.time() - _CACHE_TTL_SECONDS
+    try:
+        for path in _CACHE_DIR.glob("*.mp3"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+_sweep_cache()
+
+
+def _synth_chunk(chunk: str, gtts_lang: str) -> bytes:
+    buf = io.BytesIO()
+    tts = gTTS(text=chunk, lang=gtts_lang, slow=False,
+               tokenizer_func=_GTTS_TOKENIZER)
+    tts.write_to_fp(buf)
+    return buf.getvalue()
+
 
 def generate_tts(text: str, lang: str = "en") -> bytes:
-    """Generate MP3 audio bytes for the given text and language."""
+    """Generate MP3 audio bytes for the given text and language.
+
+    Multi-sentence text is synthesized one sentence per concurrent gTTS
+    request and the MP3 streams joined (MP3 is concatenation-safe), so
+    long text costs ~one round trip instead of one per sentence. Single
+    sentences keep the plain one-request path.
+    """
     gtts_lang = GTTS_LANG_MAP.get(lang, "en")
+    chunks = [c for c in _SENTENCE_RE.split(text) if c.strip()]
+
+    last_exc = None
+    for attempt_lang in dict.fromkeys((gtts_lang, "en")):
+        try:
+            if len(chunks) <= 1:
+                return _synth_chunk(text, attempt_lang)
+            with ThreadPoolExecutor(
+                max_workers=min(_TTS_WORKERS, len(chunks))
+            ) as executor:
+                parts = executor.map(_synth_chunk, chunks, repeat(attempt_lang))
+                return b"".join(parts)
+        except Exception as exc:
+            last_exc = exc
+    raise RuntimeError(f"TTS synthesis failed for language {lang!r}") from last_exc
+
+
+def generate_tts_cached(text: str, lang: str = "en") -> bytes:
+    """Disk-cached generate_tts; warm hits skip the network entirely.
+
+    Audio is keyed by blake2b(lang NUL text) and written atomically
+    (tempfile + os.replace) so concurrent requests never serve a partial
+    file. Cache failures fall through to plain synthesis.
+    """
+    key = hashlib.blake2b(f"{lang}\0{text}".encode(), digest_size=16).hexdigest()
+    path = _CACHE_DIR / f"{lang}_{key}.mp3"
+    try:
+        return path.read_bytes()
+    except OSError:
+        pass
+
+    audio = generate_tts(text, lang)
     try:
-        tts = gTTS(text=text, lang=gtts_lang, slow=False)
-        buf = io.BytesIO()
-        tts.write_to_fp(buf)
-        buf.seek(0)
-        return buf.read()
-    except Exception:
-        if lang != "en":
-            return generate_tts(text, "en")
-        raise
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(audio)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # best-effort cache
+    return audio
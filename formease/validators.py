@@ -2,6 +2,17 @@ import re
 from formease.models import FieldType
 
 
+# Precompiled at import so per-keystroke validation skips pattern parsing
+# and the re module's cache lookup.
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_PHONE_STRIP_RE = re.compile(r"[\s\-\+\(\)]")
+_DATE_RES = (
+    re.compile(r"^\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}$"),
+    re.compile(r"^\d{4}[/\-]\d{1,2}[/\-]\d{1,2}$"),
+)
+_NRIC_RE = re.compile(r"^[STFGM]\d{7}[A-Z]$")
+
+
 def validate_field(field_type: FieldType, answer: str) -> tuple[bool, str | None]:
     """Validate a field answer based on its type.
 
@@ -13,24 +24,20 @@ def validate_field(field_type: FieldType, answer: str) -> tuple[bool, str | None
     answer = answer.strip()
 
     if field_type == FieldType.EMAIL:
-        if not re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", answer):
+        if not _EMAIL_RE.match(answer):
             return False, "Please enter a valid email address (must contain @)."
 
     elif field_type == FieldType.PHONE:
-        digits = re.sub(r"[\s\-\+\(\)]", "", answer)
+        digits = _PHONE_STRIP_RE.sub("", answer)
         if not digits.isdigit() or len(digits) < 7 or len(digits) > 15:
-            return False, "Please enter a valid phone number (7\u201315 digits)."
+            return False, "Please enter a valid phone number (7–15 digits)."
 
     elif field_type == FieldType.DATE:
-        patterns = [
-            r"^\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}$",
-            r"^\d{4}[/\-]\d{1,2}[/\-]\d{1,2}$",
-        ]
-        if not any(re.match(p, answer) for p in patterns):
+        if not any(p.match(answer) for p in _DATE_RES):
             return False, "Please enter a valid date (DD/MM/YYYY or YYYY-MM-DD)."
 
     elif field_type == FieldType.NRIC:
-        if not re.match(r"^[STFGM]\d{7}[A-Z]$", answer.upper()):
+        if not _NRIC_RE.match(answer.upper()):
             return False, "Please enter a valid NRIC/FIN (e.g., S1234567A)."
 
     elif field_type == FieldType.NUMBER:
@@ -5,15 +5,37 @@ Upload a photo → OCR extracts text → text is spoken aloud → audio saved as
 
 import sys
 import os
-from PIL import Image, ImageDraw, ImageFont
-import pytesseract
-from gtts import gTTS
+
+# Heavy third-party modules (PIL, pytesseract, gTTS, rapidocr) are imported
+# inside the functions that need them, so `--help`-style invocations and
+# partial pipelines don't pay the full cold-import cost.
+
+_rapid_ocr = None
+
+
+def _get_rapid_ocr():
+    """Load the PP-OCR models once, and only when the backend is requested.
+
+    Returns None when rapidocr-onnxruntime isn't installed.
+    """
+    global _rapid_ocr
+    if _rapid_ocr is None:
+        try:
+            # ONNX Runtime build of PP-OCR: AVX2/AVX-512 GEMM kernels on
+            # CPU, optional CUDA — much faster than Tesseract's LSTM.
+            from rapidocr_onnxruntime import RapidOCR
+        except ImportError:
+            return None
+        _rapid_ocr = RapidOCR()
+    return _rapid_ocr
 
 
 # ─── Test image generator ────────────────────────────────────────────────────
 
 def generate_test_image(output_path="test_image.png"):
     """Create a sample image with printed text so you can test without a real photo."""
+    from PIL import Image, ImageDraw, ImageFont
+
     img = Image.new("RGB", (900, 500), color="white")
     draw = ImageDraw.Draw(img)
 
@@ -50,16 +72,46 @@ def generate_test_image(output_path="test_image.png"):
 # ─── Core pipeline stages ────────────────────────────────────────────────────
 
 def extract_text(image_path: str) -> str:
-    """Run Tesseract OCR on an image and return the detected text."""
-    image = Image.open(image_path).convert("RGB")
+    """Run Tesseract OCR on an image and return the detected text.
+
+    The image is grayscaled, capped at 2000px on the long edge, and
+    contrast-stretched first — fewer pixels and a cleaner histogram make
+    Tesseract both faster and more accurate on photos.
+
+    Set FORMEASE_OCR_BACKEND=rapidocr (with rapidocr-onnxruntime
+    installed) to use the PP-OCR models instead; Tesseract remains the
+    fallback when the package is missing or finds nothing.
+    """
+    if os.getenv("FORMEASE_OCR_BACKEND", "tesseract").lower() == "rapidocr":
+        ocr = _get_rapid_ocr()
+        if ocr is not None:
+            result, _ = ocr(image_path)
+            if result:
+                return "\n".join(line[1] for line in result).strip()
+
+    import pytesseract
+    from PIL import Image, ImageOps
+
+    image = Image.open(image_path).convert("L")
+    scale = min(1.0, 2000 / max(image.size))
+    if scale < 1.0:
+        image = image.resize(
+            (int(image.width * scale), int(image.height * scale)), Image.LANCZOS
+        )
+    image = ImageOps.autocontrast(image, cutoff=2)
+    # --oem 1  →  LSTM engine only (skips the legacy engine entirely)
     # --psm 3  →  assume fully automatic page segmentation (default, works best
     #             for multi-line photos / screenshots / scans)
-    text = pytesseract.image_to_string(image, config="--psm 3")
+    text = pytesseract.image_to_string(
+        image, config="--oem 1 --psm 3 -c preserve_interword_spaces=1"
+    )
     return text.strip()
 
 
 def text_to_speech(text: str, output_path: str = "output.mp3", lang: str = "en"):
     """Convert a text string to an MP3 audio file via Google TTS."""
+    from gtts import gTTS
+
     tts = gTTS(text=text, lang=lang, slow=False)
     tts.save(output_path)
 